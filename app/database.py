@@ -1,15 +1,60 @@
 import sqlite3
-from typing import List
+import threading
+from contextlib import contextmanager
+from itertools import groupby
+from typing import List, Optional
+import numpy as np
 from app.planner import Waypoint
 
 DB_PATH = "data/robot_trajectories.db"
 
-def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+# One connection for the whole process: keeps the page cache warm and avoids
+# re-opening the file (and rolling the journal) on every request.
+_conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+for pragma in PRAGMAS:
+    _conn.execute(pragma)
+_lock = threading.Lock()
+
+# Waypoints are stored in trajectory order as one packed BLOB per trajectory.
+# Coordinates stay float64 so a stored trajectory reads back exactly as generated.
+WAYPOINT_DTYPE = np.dtype([("x", "<f8"), ("y", "<f8"), ("action", "u1")])
+ACTIONS = ("move", "paint")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+@contextmanager
+def transaction():
+    with _lock:
+        cursor = _conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+
+def pack_waypoints(waypoints: List[Waypoint]) -> bytes:
+    return np.array(
+        [(wp.x, wp.y, ACTION_CODES[wp.action]) for wp in waypoints],
+        dtype=WAYPOINT_DTYPE
+    ).tobytes()
+
+def unpack_waypoints(blob: bytes) -> List[Waypoint]:
+    return [
+        Waypoint.model_construct(x=x, y=y, action=ACTIONS[action])
+        for x, y, action in np.frombuffer(blob, dtype=WAYPOINT_DTYPE).tolist()
+    ]
 
 def init_db():
-    with get_connection() as conn:
-        cursor = conn.cursor()
+    with transaction() as cursor:
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS trajectories (
             id TEXT PRIMARY KEY,
@@ -20,20 +65,32 @@ def init_db():
             coverage_percent REAL,
             path_length REAL,
             duration REAL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS waypoints (
-            trajectory_id TEXT,
-            x REAL,
-            y REAL,
-            action TEXT,
-            FOREIGN KEY (trajectory_id) REFERENCES trajectories(id)
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            waypoints BLOB
         )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_waypoints_trajectory ON waypoints(trajectory_id)")
-        conn.commit()
+        _migrate_waypoints_table(cursor)
+
+def _migrate_waypoints_table(cursor):
+    """Move waypoints from the old one-row-per-waypoint table into BLOBs"""
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(trajectories)")]
+    if "waypoints" not in columns:
+        cursor.execute("ALTER TABLE trajectories ADD COLUMN waypoints BLOB")
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'waypoints'")
+    if not cursor.fetchone():
+        return
+
+    rows = cursor.execute("""
+    SELECT trajectory_id, x, y, action FROM waypoints
+    ORDER BY trajectory_id, rowid
+    """).fetchall()
+    for trajectory_id, group in groupby(rows, key=lambda row: row[0]):
+        blob = pack_waypoints([
+            Waypoint.model_construct(x=x, y=y, action=action) for _, x, y, action in group
+        ])
+        cursor.execute("UPDATE trajectories SET waypoints = ? WHERE id = ?", (blob, trajectory_id))
+    cursor.execute("DROP TABLE waypoints")
 
 def save_trajectory(
     trajectory_id: str,
@@ -42,48 +99,37 @@ def save_trajectory(
     coverage_width: float,
     obstacles: int,
     waypoints: List[Waypoint],
+    path_length: float,
     duration: float
-):
-    from math import hypot
-
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM trajectories WHERE id = ?", (trajectory_id,))
-        if cursor.fetchone():
-            return
-
-        path_length = sum(
-            hypot(waypoints[i].x - waypoints[i-1].x, waypoints[i].y - waypoints[i-1].y)
-            for i in range(1, len(waypoints))
-        )
-        coverage_percent = round((path_length * coverage_width) / (width * height) * 100, 2)
+) -> bytes:
+    """Store a trajectory and return its waypoints as packed bytes"""
+    coverage_percent = round((path_length * coverage_width) / (width * height) * 100, 2)
+    blob = pack_waypoints(waypoints)
 
+    with transaction() as cursor:
         cursor.execute("""
-        INSERT INTO trajectories (id, width, height, obstacle_count, coverage_width, coverage_percent, path_length, duration)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (trajectory_id, width, height, obstacles, coverage_width, coverage_percent, path_length, duration))
+        INSERT OR IGNORE INTO trajectories (id, width, height, obstacle_count, coverage_width, coverage_percent, path_length, duration, waypoints)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (trajectory_id, width, height, obstacles, coverage_width, coverage_percent, path_length, duration, blob))
+    return blob
 
-        cursor.executemany("""
-        INSERT INTO waypoints (trajectory_id, x, y, action)
-        VALUES (?, ?, ?, ?)
-        """, [(trajectory_id, wp.x, wp.y, wp.action) for wp in waypoints])
-        conn.commit()
+def get_trajectory_blob(trajectory_id: str) -> Optional[bytes]:
+    with _lock:
+        cursor = _conn.cursor()
+        cursor.execute("SELECT waypoints FROM trajectories WHERE id = ?", (trajectory_id,))
+        row = cursor.fetchone()
 
-def get_trajectory_by_id(trajectory_id: str) -> List[Waypoint]:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        SELECT x, y, action FROM waypoints
-        WHERE trajectory_id = ?
-        ORDER BY y, x
-        """, (trajectory_id,))
-        rows = cursor.fetchall()
+    return row[0] if row else None
 
-    return [Waypoint(x=row[0], y=row[1], action=row[2]) for row in rows]
+def get_trajectory_by_id(trajectory_id: str) -> List[Waypoint]:
+    blob = get_trajectory_blob(trajectory_id)
+    if blob is None:
+        return []
+    return unpack_waypoints(blob)
 
 def get_metrics_summary():
-    with get_connection() as conn:
-        cursor = conn.cursor()
+    with _lock:
+        cursor = _conn.cursor()
         cursor.execute("""
         SELECT COUNT(*), AVG(coverage_percent), AVG(duration), MAX(timestamp)
         FROM trajectories
@@ -1,27 +1,43 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import time
 from functools import wraps
 
 LOG_PATH = os.getenv("LOG_PATH", "logs/robot_api.log")
 
-logging.basicConfig(
-    filename=LOG_PATH,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+# Request handlers only enqueue records; a background listener thread
+# formats them and writes the file. The file is opened here so a bad path
+# fails at import rather than killing the listener on its first record.
+os.makedirs(os.path.dirname(LOG_PATH) or ".", exist_ok=True)
+_file_handler = logging.FileHandler(LOG_PATH)
+_file_handler.setFormatter(logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S"
-)
+))
+# Bounded so a stalled listener drops records (via handleError) instead of
+# growing without limit
+LOG_QUEUE_SIZE = 10000
+_log_queue = queue.Queue(LOG_QUEUE_SIZE)
+_listener = logging.handlers.QueueListener(_log_queue, _file_handler)
+_listener.start()
+atexit.register(_listener.stop)
 
 logger = logging.getLogger("robot-api")
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.propagate = False
 
 def log_timing(endpoint_name):
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start = time.time()
+            start = time.perf_counter_ns()
             result = await func(*args, **kwargs)
-            duration = round(time.time() - start, 3)
-            logger.info(f"{endpoint_name} completed in {duration}s")
+            duration_ms = (time.perf_counter_ns() - start) / 1e6
+            logger.info("%s completed in %.3fms", endpoint_name, duration_ms)
             return result
         return wrapper
     return decorator
\ No newline at end of file
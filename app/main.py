@@ -1,24 +1,49 @@
-from fastapi import FastAPI, HTTPException, WebSocket
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import Response
+from contextlib import asynccontextmanager
+from typing import List, Optional, Set, Tuple
 import time
 import hashlib
+import functools
 import traceback
 import asyncio
-import json
-import redis
-
-from app.planner import generate_trajectory, WallConfig, Waypoint
+import numpy as np
+import orjson
+from pydantic import ValidationError
+
+from app.planner import (
+    generate_trajectory,
+    obstacle_array,
+    WallConfig,
+    Waypoint,
+    WALL_CONFIG_ADAPTER
+)
 from app.database import (
     save_trajectory,
-    get_trajectory_by_id,
+    get_trajectory_blob,
+    unpack_waypoints,
     get_metrics_summary,
     init_db
 )
 from app.logger import logger, log_timing
-from app.pubsub import publish_trajectory_event
+from app.pubsub import (
+    publish_trajectory_event,
+    get_cached_trajectory,
+    cache_trajectory,
+    redis_client,
+    CHANNEL_NAME
+)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = await start_update_listener()
+    yield
+    if listener:
+        listener.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,63 +58,161 @@ init_db()
 def health_check():
     return {"status": "ok"}
 
-@app.post("/api/trajectories", response_model=List[Waypoint])
-@log_timing("create_trajectory")
-async def create_trajectory(config: WallConfig):
-    start = time.time()
+@functools.lru_cache(maxsize=256)
+def _plan(config_key: tuple) -> Tuple[List[Waypoint], float]:
+    width, height, coverage_width, obstacle_bytes = config_key
+    obstacles = np.frombuffer(obstacle_bytes, dtype="<f8").reshape(-1, 4)
+    # The obstacle array is authoritative, so the config only carries dimensions
+    config = WallConfig.model_construct(
+        width=width,
+        height=height,
+        coverage_width=coverage_width,
+        obstacles=[]
+    )
+    return generate_trajectory(config, obstacles)
 
-    # Validate obstacle bounds
-    for obs in config.obstacles:
-        if obs.x + obs.width > config.width or obs.y + obs.height > config.height:
-            raise HTTPException(status_code=400, detail="Obstacle exceeds wall bounds")
+def waypoints_response(waypoints: List[Waypoint]) -> Response:
+    """Serialize waypoints with orjson, skipping response_model validation"""
+    return Response(
+        orjson.dumps([{"x": wp.x, "y": wp.y, "action": wp.action} for wp in waypoints]),
+        media_type="application/json"
+    )
+
+async def load_trajectory(trajectory_id: str) -> List[Waypoint]:
+    """Fetch stored waypoints, trying the Redis cache before SQLite"""
+    blob = await get_cached_trajectory(trajectory_id)
+    if blob is None:
+        blob = await asyncio.to_thread(get_trajectory_blob, trajectory_id)
+        if blob is None:
+            return []
+        await cache_trajectory(trajectory_id, blob)
+    return unpack_waypoints(blob)
+
+def _inline_defs(schema: dict) -> dict:
+    """Resolve local $defs references so the schema stands alone inside OpenAPI"""
+    defs = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(defs[node["$ref"].split("/")[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(item) for item in node]
+        return node
+
+    return resolve(schema)
+
+@app.post(
+    "/api/trajectories",
+    responses={200: {"model": List[Waypoint]}},
+    # The body is parsed by hand below, so describe it for the docs explicitly
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": _inline_defs(WALL_CONFIG_ADAPTER.json_schema())}}
+    }}
+)
+@log_timing("create_trajectory")
+async def create_trajectory(request: Request):
+    start = time.perf_counter_ns()
 
-    config_str = f"{config.width}-{config.height}-{[(o.x, o.y, o.width, o.height) for o in config.obstacles]}"
-    config_hash = hashlib.md5(config_str.encode()).hexdigest()
+    # Parse and validate the body in one step instead of through FastAPI's body dependency
+    try:
+        config = WALL_CONFIG_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ])
 
+    # Validate obstacle bounds
+    obstacles = obstacle_array(config.obstacles)
+    if (np.any(obstacles[:, 0] + obstacles[:, 2] > config.width)
+            or np.any(obstacles[:, 1] + obstacles[:, 3] > config.height)):
+        raise HTTPException(status_code=400, detail="Obstacle exceeds wall bounds")
+
+    # Same bytes as struct.pack("<d...") of width, height, coverage_width, obstacles
+    dimensions = np.array([config.width, config.height, config.coverage_width], dtype="<f8")
+    config_hash = hashlib.blake2b(dimensions.tobytes() + obstacles.tobytes(), digest_size=16).hexdigest()
+
+    # Identical configs always produce the same trajectory, so reuse a stored one
+    existing = await load_trajectory(config_hash)
+    if existing:
+        logger.info("Trajectory %s reused from storage", config_hash)
+        return waypoints_response(existing)
+
+    # Obstacle order doesn't affect the plan, so sort rows for the cache key
+    sorted_obstacles = obstacles[np.lexsort(obstacles.T[::-1])]
+    config_key = (config.width, config.height, config.coverage_width, sorted_obstacles.tobytes())
     try:
-        trajectory = generate_trajectory(config)
+        trajectory, path_length = await asyncio.to_thread(_plan, config_key)
     except Exception:
         logger.error(f"Trajectory generation failed:\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal error")
 
-    duration = round(time.time() - start, 3)
-    logger.info(f"Trajectory {config_hash} generated with {len(config.obstacles)} obstacles in {duration}s")
+    duration = (time.perf_counter_ns() - start) / 1e9
+    logger.info("Trajectory %s generated with %d obstacles in %.3fs", config_hash, len(config.obstacles), duration)
 
-    save_trajectory(
+    blob = await asyncio.to_thread(
+        save_trajectory,
         trajectory_id=config_hash,
         width=config.width,
         height=config.height,
         coverage_width=config.coverage_width,
         obstacles=len(config.obstacles),
         waypoints=trajectory,
+        path_length=path_length,
         duration=duration
     )
+    await cache_trajectory(config_hash, blob)
 
-    publish_trajectory_event(config_hash, {
+    await publish_trajectory_event(config_hash, {
         "width": config.width,
         "height": config.height,
         "obstacles": len(config.obstacles),
         "duration": duration
     })
 
-    return trajectory
+    return waypoints_response(trajectory)
 
-@app.get("/api/trajectories/{trajectory_id}", response_model=List[Waypoint])
-def get_trajectory(trajectory_id: str):
-    return get_trajectory_by_id(trajectory_id)
+@app.get("/api/trajectories/{trajectory_id}", responses={200: {"model": List[Waypoint]}})
+async def get_trajectory(trajectory_id: str):
+    return waypoints_response(await load_trajectory(trajectory_id))
 
 @app.get("/api/metrics")
-def metrics():
-    return get_metrics_summary()
-
-# Redis setup with error handling
-try:
-    redis_client = redis.Redis.from_url("redis://localhost:6379")
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe("trajectory_updates")
-except Exception as e:
-    pubsub = None
-    logger.warning(f"Redis not available: {str(e)}")
+async def metrics():
+    return await asyncio.to_thread(get_metrics_summary)
+
+# A single Redis subscription per process, fanned out to every connected
+# WebSocket through its own queue. None tells a socket the feed has ended.
+subscribers: Set[asyncio.Queue] = set()
+pubsub = None
+
+async def start_update_listener() -> Optional[asyncio.Task]:
+    global pubsub
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(CHANNEL_NAME)
+    except Exception as e:
+        pubsub = None
+        logger.warning(f"Redis not available: {str(e)}")
+        return None
+    return asyncio.create_task(fan_out_updates())
+
+async def fan_out_updates():
+    global pubsub
+    try:
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                data = message["data"].decode()
+                for queue in subscribers:
+                    queue.put_nowait(data)
+    except Exception as e:
+        logger.error(f"Redis subscription lost: {str(e)}")
+    finally:
+        await pubsub.aclose()
+        pubsub = None
+        for queue in subscribers:
+            queue.put_nowait(None)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -99,12 +222,14 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close()
         return
 
+    queue = asyncio.Queue()
+    subscribers.add(queue)
     try:
-        while True:
-            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
-            if message and message["type"] == "message":
-                await websocket.send_text(message["data"].decode())
-            await asyncio.sleep(0.1)
+        while (data := await queue.get()) is not None:
+            await websocket.send_text(data)
+        await websocket.close()
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
-        await websocket.close()
\ No newline at end of file
+        await websocket.close()
+    finally:
+        subscribers.discard(queue)
\ No newline at end of file
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Tuple, Optional
+from collections import deque
 import heapq
+import numpy as np
 
 class Obstacle(BaseModel):
     x: float
@@ -19,84 +21,122 @@ class Waypoint(BaseModel):
     y: float
     action: str  # "move" or "paint"
 
-class Cell:
-    """Represents a grid cell for path planning"""
-    def __init__(self, row: int, col: int, x: float, y: float):
-        self.row = row
-        self.col = col
-        self.x = x
-        self.y = y
-        self.visited = False
-        self.blocked = False
-    
-    def __lt__(self, other):
-        return (self.row, self.col) < (other.row, other.col)
+# Built once at import; validates raw JSON request bodies directly
+WALL_CONFIG_ADAPTER = TypeAdapter(WallConfig)
 
-def generate_trajectory(config: WallConfig) -> List[Waypoint]:
+def obstacle_array(obstacles: List[Obstacle]) -> np.ndarray:
+    """Stack obstacles into an (n, 4) float64 array of x, y, width, height"""
+    return np.array(
+        [(o.x, o.y, o.width, o.height) for o in obstacles], dtype="<f8"
+    ).reshape(-1, 4)
+
+def generate_trajectory(
+    config: WallConfig,
+    obstacles: Optional[np.ndarray] = None
+) -> Tuple[List[Waypoint], float]:
     """
     Generate wall painting trajectory with intelligent obstacle avoidance.
     When obstacle is encountered, robot goes around it and fills all gaps.
+    Returns the waypoints and the painted path length (horizontal strokes only).
+    Callers that already hold obstacle_array(config.obstacles) can pass it in;
+    when given, it is authoritative and config.obstacles is not read.
     """
+    if obstacles is None:
+        obstacles = obstacle_array(config.obstacles)
+    if not len(obstacles):
+        return _flat_boustrophedon(config)
+    
     # Create a grid representation
-    grid = create_grid(config)
+    xs, ys, blocked = create_grid(config)
     
     # Mark obstacles
-    mark_obstacles(grid, config)
+    mark_obstacles(xs, ys, blocked, obstacles, config)
     
     # Generate painting path
-    waypoints = paint_with_obstacle_avoidance(grid, config)
+    waypoints, path_length = paint_with_obstacle_avoidance(xs, ys, blocked, config)
+    
+    return remove_consecutive_duplicates(waypoints), path_length
+
+def _flat_boustrophedon(config: WallConfig) -> Tuple[List[Waypoint], float]:
+    """
+    Obstacle-free wall: paint every row end to end, alternating direction.
+    Produces the same path as the general planner without segmenting,
+    navigating or de-duplicating.
+    """
+    xs, ys, _ = create_grid(config)
+    forward = xs.tolist()
+    backward = forward[::-1]
+    
+    waypoints = [
+        Waypoint.model_construct(x=x, y=y, action="paint")
+        for row, y in enumerate(ys.tolist())
+        for x in (forward if row % 2 == 0 else backward)
+    ]
+    waypoints[0] = Waypoint.model_construct(x=waypoints[0].x, y=waypoints[0].y, action="move")
     
-    return remove_consecutive_duplicates(waypoints)
+    return waypoints, len(ys) * (forward[-1] - forward[0])
 
-def create_grid(config: WallConfig) -> List[List[Cell]]:
-    """Create grid cells for the wall"""
+def create_grid(config: WallConfig) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Create the wall grid as arrays: cell-center x per column, cell-center y
+    per row, and a (rows, cols) blocked mask.
+    """
     num_rows = max(1, int(config.height / config.coverage_width))
     num_cols = max(1, int(config.width / config.coverage_width))
     
-    grid = []
-    for row in range(num_rows):
-        grid_row = []
-        y = (row + 0.5) * config.coverage_width
-        
-        for col in range(num_cols):
-            x = (col + 0.5) * config.coverage_width
-            cell = Cell(row, col, x, y)
-            grid_row.append(cell)
-        
-        grid.append(grid_row)
+    xs = (np.arange(num_cols) + 0.5) * config.coverage_width
+    ys = (np.arange(num_rows) + 0.5) * config.coverage_width
+    blocked = np.zeros((num_rows, num_cols), dtype=bool)
     
-    return grid
+    return xs, ys, blocked
 
-def mark_obstacles(grid: List[List[Cell]], config: WallConfig):
-    """Mark grid cells that are blocked by obstacles"""
-    for row in grid:
-        for cell in row:
-            for obs in config.obstacles:
-                # Check if cell center is inside obstacle (with small margin)
-                margin = config.coverage_width * 0.3
-                if (obs.x - margin <= cell.x <= obs.x + obs.width + margin and
-                    obs.y - margin <= cell.y <= obs.y + obs.height + margin):
-                    cell.blocked = True
-                    break
+def mark_obstacles(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    blocked: np.ndarray,
+    obstacles: np.ndarray,
+    config: WallConfig
+):
+    """Mark grid cells that are blocked by obstacles (an obstacle_array)"""
+    margin = config.coverage_width * 0.3
+    x, y, width, height = obstacles.T
+    
+    # Cells whose center is inside an obstacle (with small margin) form a
+    # contiguous block, so find every obstacle's row/col bounds at once and
+    # block each by slicing
+    c0 = np.searchsorted(xs, x - margin, side="left").tolist()
+    c1 = np.searchsorted(xs, x + width + margin, side="right").tolist()
+    r0 = np.searchsorted(ys, y - margin, side="left").tolist()
+    r1 = np.searchsorted(ys, y + height + margin, side="right").tolist()
+    for row_start, row_end, col_start, col_end in zip(r0, r1, c0, c1):
+        blocked[row_start:row_end, col_start:col_end] = True
 
-def paint_with_obstacle_avoidance(grid: List[List[Cell]], config: WallConfig) -> List[Waypoint]:
+def paint_with_obstacle_avoidance(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    blocked: np.ndarray,
+    config: WallConfig
+) -> Tuple[List[Waypoint], float]:
     """
     Main painting algorithm: boustrophedon with obstacle navigation.
     When hitting obstacle, go around it and continue painting.
     """
-    if not grid or not grid[0]:
-        return []
+    if blocked.size == 0:
+        return [], 0.0
     
     waypoints = []
-    num_rows = len(grid)
-    num_cols = len(grid[0])
+    path_length = 0.0
+    num_rows, num_cols = blocked.shape
+    visited = np.zeros_like(blocked)
     
     row = 0
     direction = 1  # 1 = left-to-right, -1 = right-to-left
     
+    # Paintable segments of every row
+    row_segments = get_row_segments(blocked)
+    
     while row < num_rows:
-        # Get paintable segments in this row
-        segments = get_row_segments(grid, row)
+        segments = row_segments[row]
         
         if not segments:
             row += 1
@@ -108,16 +148,17 @@ def paint_with_obstacle_avoidance(grid: List[List[Cell]], config: WallConfig) ->
             segments = segments[::-1]
         
         for seg_start_col, seg_end_col in segments:
-            # Navigate to segment start if needed
+            # Navigate to segment start (in the direction of travel) if needed
             if waypoints:
                 last_x, last_y = waypoints[-1].x, waypoints[-1].y
-                target_cell = grid[row][seg_start_col]
+                entry_col = seg_start_col if direction == 1 else seg_end_col
+                target_x, target_y = float(xs[entry_col]), float(ys[row])
                 
                 # Check if we need to navigate around obstacles
-                if not is_adjacent(last_x, last_y, target_cell.x, target_cell.y, config.coverage_width):
+                if not is_adjacent(last_x, last_y, target_x, target_y, config.coverage_width):
                     # Find path around obstacles
                     nav_path = find_path_around_obstacles(
-                        grid, last_x, last_y, target_cell, config
+                        xs, ys, blocked, last_x, last_y, (row, entry_col), config
                     )
                     waypoints.extend(nav_path)
             
@@ -127,47 +168,50 @@ def paint_with_obstacle_avoidance(grid: List[List[Cell]], config: WallConfig) ->
             else:
                 cols = range(seg_end_col, seg_start_col - 1, -1)
             
+            y = float(ys[row])
             for col in cols:
-                cell = grid[row][col]
-                if not cell.blocked and not cell.visited:
+                if not blocked[row, col] and not visited[row, col]:
+                    x = float(xs[col])
                     # Determine action based on continuity
                     if waypoints and is_adjacent(waypoints[-1].x, waypoints[-1].y, 
-                                                 cell.x, cell.y, config.coverage_width):
+                                                 x, y, config.coverage_width):
                         action = "paint"
+                        if waypoints[-1].y == y:
+                            path_length += abs(x - waypoints[-1].x)
                     else:
                         action = "move"
                     
-                    waypoints.append(Waypoint(x=cell.x, y=cell.y, action=action))
-                    cell.visited = True
+                    # Coordinates come from the grid, so skip per-waypoint validation
+                    waypoints.append(Waypoint.model_construct(x=x, y=y, action=action))
+                    visited[row, col] = True
         
         row += 1
         direction *= -1
     
     # Fill any remaining unvisited cells (isolated regions)
-    fill_isolated_regions(grid, waypoints, config)
+    path_length += fill_isolated_regions(xs, ys, blocked, visited, waypoints, config)
     
-    return waypoints
+    return waypoints, path_length
 
-def get_row_segments(grid: List[List[Cell]], row: int) -> List[Tuple[int, int]]:
-    """Get continuous segments of non-blocked cells in a row"""
-    if row >= len(grid):
-        return []
-    
-    segments = []
-    start_col = None
+def get_row_segments(blocked: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """
+    Get continuous segments of non-blocked cells for every row in one pass.
+    Segment edges are where the padded free mask changes along the row.
+    """
+    num_rows, num_cols = blocked.shape
+    row_has_obstacle = blocked.any(axis=1).tolist()
     
-    for col, cell in enumerate(grid[row]):
-        if not cell.blocked:
-            if start_col is None:
-                start_col = col
-        else:
-            if start_col is not None:
-                segments.append((start_col, col - 1))
-                start_col = None
+    free = np.zeros((num_rows, num_cols + 2), dtype=np.int8)
+    free[:, 1:-1] = ~blocked
+    edges = np.diff(free, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    end_cols = np.nonzero(edges == -1)[1] - 1
     
-    # Close last segment
-    if start_col is not None:
-        segments.append((start_col, len(grid[row]) - 1))
+    # Rows without obstacles are a single full-width segment
+    segments = [[] if has_obstacle else [(0, num_cols - 1)] for has_obstacle in row_has_obstacle]
+    for row, seg_start, seg_end in zip(start_rows.tolist(), start_cols.tolist(), end_cols.tolist()):
+        if row_has_obstacle[row]:
+            segments[row].append((seg_start, seg_end))
     
     return segments
 
@@ -178,110 +222,212 @@ def is_adjacent(x1: float, y1: float, x2: float, y2: float, coverage: float) ->
     threshold = coverage * 1.5
     return dx < threshold and dy < threshold
 
+def is_neighbour(x1: float, y1: float, x2: float, y2: float, coverage: float) -> bool:
+    """Check if two points are the same or 4-connected neighbouring cells (no diagonals)"""
+    return abs(x2 - x1) + abs(y2 - y1) < coverage * 1.5
+
 def find_path_around_obstacles(
-    grid: List[List[Cell]], 
+    xs: np.ndarray,
+    ys: np.ndarray,
+    blocked: np.ndarray,
     start_x: float, 
     start_y: float, 
-    target_cell: Cell,
+    target: Tuple[int, int],
     config: WallConfig
 ) -> List[Waypoint]:
     """
     Use A* pathfinding to navigate around obstacles.
     Returns waypoints with action="move" for navigation.
     """
+    num_rows, num_cols = blocked.shape
+    
     # Find start cell
-    start_cell = find_nearest_cell(grid, start_x, start_y)
-    if not start_cell or start_cell.blocked:
+    start = _coord_to_cell(start_x, start_y, config.coverage_width, blocked)
+    if start is None:
         return []
+    start_row, start_col = start
     
-    # A* algorithm
-    def heuristic(cell: Cell) -> float:
-        return abs(cell.x - target_cell.x) + abs(cell.y - target_cell.y)
+    # A* over flat cell indices (row * num_cols + col); costs and the
+    # Manhattan heuristic are in whole cells
+    target_row, target_col = target
+    target_idx = target_row * num_cols + target_col
+    start_idx = start_row * num_cols + start_col
+    is_blocked = blocked.ravel()
     
-    open_set = [(heuristic(start_cell), start_cell)]
-    came_from = {}
-    g_score = {(start_cell.row, start_cell.col): 0}
+    g_score = np.full(blocked.size, np.iinfo(np.int32).max, dtype=np.int32)
+    came_from = np.full(blocked.size, -1, dtype=np.int32)
+    g_score[start_idx] = 0
+    open_set = [(abs(start_row - target_row) + abs(start_col - target_col), start_idx)]
     
     while open_set:
         _, current = heapq.heappop(open_set)
         
         # Reached target
-        if current.row == target_cell.row and current.col == target_cell.col:
-            return reconstruct_path(came_from, current, start_cell)
+        if current == target_idx:
+            return reconstruct_path(xs, ys, came_from, current, start_idx)
+        
+        row, col = divmod(current, num_cols)
+        tentative_g = int(g_score[current]) + 1
         
         # Check all neighbors (4-directional)
         for dr, dc in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            new_row = current.row + dr
-            new_col = current.col + dc
+            new_row = row + dr
+            new_col = col + dc
             
             # Check bounds
-            if new_row < 0 or new_row >= len(grid):
+            if new_row < 0 or new_row >= num_rows:
                 continue
-            if new_col < 0 or new_col >= len(grid[0]):
+            if new_col < 0 or new_col >= num_cols:
                 continue
             
-            neighbor = grid[new_row][new_col]
+            neighbor = new_row * num_cols + new_col
             
             # Skip blocked cells
-            if neighbor.blocked:
+            if is_blocked[neighbor]:
                 continue
             
-            # Calculate scores
-            tentative_g = g_score[(current.row, current.col)] + config.coverage_width
-            
-            if (neighbor.row, neighbor.col) not in g_score or tentative_g < g_score[(neighbor.row, neighbor.col)]:
-                came_from[(neighbor.row, neighbor.col)] = current
-                g_score[(neighbor.row, neighbor.col)] = tentative_g
-                f_score = tentative_g + heuristic(neighbor)
+            if tentative_g < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                f_score = tentative_g + abs(new_row - target_row) + abs(new_col - target_col)
                 heapq.heappush(open_set, (f_score, neighbor))
     
     # No path found
     return []
 
-def reconstruct_path(came_from: dict, current: Cell, start: Cell) -> List[Waypoint]:
-    """Reconstruct path from A* came_from mapping"""
+def reconstruct_path(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    came_from: np.ndarray,
+    current: int,
+    start: int
+) -> List[Waypoint]:
+    """Reconstruct path from the A* parent array of flat cell indices"""
+    num_cols = len(xs)
     path = []
     
-    while (current.row, current.col) in came_from:
-        # Don't include start cell in navigation path
-        if current.row != start.row or current.col != start.col:
-            path.append(Waypoint(x=current.x, y=current.y, action="move"))
-        current = came_from[(current.row, current.col)]
+    # Don't include start cell in navigation path
+    while current != start and current != -1:
+        row, col = divmod(current, num_cols)
+        path.append(Waypoint.model_construct(x=float(xs[col]), y=float(ys[row]), action="move"))
+        current = int(came_from[current])
     
     return list(reversed(path))
 
-def find_nearest_cell(grid: List[List[Cell]], x: float, y: float) -> Optional[Cell]:
-    """Find the grid cell nearest to given coordinates"""
-    if not grid or not grid[0]:
-        return None
-    
-    min_dist = float('inf')
-    nearest = None
-    
-    for row in grid:
-        for cell in row:
-            dist = (cell.x - x) ** 2 + (cell.y - y) ** 2
-            if dist < min_dist:
-                min_dist = dist
-                nearest = cell
-    
-    return nearest
+def _coord_to_cell(x: float, y: float, coverage: float, blocked: np.ndarray) -> Optional[Tuple[int, int]]:
+    """
+    Find the (row, col) of the non-blocked cell nearest to given coordinates.
+    The grid is uniform, so the containing cell is computed directly; if it is
+    blocked, search outward ring by ring.
+    """
+    num_rows, num_cols = blocked.shape
+    row = min(max(int(y / coverage), 0), num_rows - 1)
+    col = min(max(int(x / coverage), 0), num_cols - 1)
+    if not blocked[row, col]:
+        return row, col
+    
+    for d in range(1, max(num_rows, num_cols)):
+        ring = [
+            (row + dr, col + dc)
+            for dr in range(-d, d + 1)
+            for dc in range(-d, d + 1)
+            if max(abs(dr), abs(dc)) == d
+            and 0 <= row + dr < num_rows and 0 <= col + dc < num_cols
+            and not blocked[row + dr, col + dc]
+        ]
+        if ring:
+            return min(ring, key=lambda rc: (rc[0] - row) ** 2 + (rc[1] - col) ** 2)
+    
+    return None
 
-def fill_isolated_regions(grid: List[List[Cell]], waypoints: List[Waypoint], config: WallConfig):
-    """Fill any remaining unvisited cells that were isolated by obstacles"""
-    for row in grid:
-        for cell in row:
-            if not cell.blocked and not cell.visited:
-                # Navigate to this cell
-                if waypoints:
-                    nav_path = find_path_around_obstacles(
-                        grid, waypoints[-1].x, waypoints[-1].y, cell, config
-                    )
-                    waypoints.extend(nav_path)
-                
-                # Paint this cell
-                waypoints.append(Waypoint(x=cell.x, y=cell.y, action="paint"))
-                cell.visited = True
+def find_regions(mask: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """
+    Label 4-connected regions of cells where mask is False.
+    Regions are ordered by their first cell, cells within a region row-major.
+    """
+    num_rows, num_cols = mask.shape
+    labelled = mask.copy()
+    regions = []
+    
+    for row, col in np.argwhere(~mask).tolist():
+        if labelled[row, col]:
+            continue
+        
+        # Breadth-first flood fill from this cell
+        labelled[row, col] = True
+        region = [(row, col)]
+        queue = deque(region)
+        while queue:
+            r, c = queue.popleft()
+            for dr, dc in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < num_rows and 0 <= nc < num_cols and not labelled[nr, nc]:
+                    labelled[nr, nc] = True
+                    region.append((nr, nc))
+                    queue.append((nr, nc))
+        
+        regions.append(sorted(region))
+    
+    return regions
+
+def fill_isolated_regions(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    blocked: np.ndarray,
+    visited: np.ndarray,
+    waypoints: List[Waypoint],
+    config: WallConfig
+) -> float:
+    """
+    Fill any remaining unvisited cells that were isolated by obstacles.
+    Each connected region of unvisited cells is painted in a serpentine,
+    reversing direction on every row, starting from whichever end is nearer
+    to the robot; A* only runs to reach the region and to bridge gaps where
+    consecutive cells are not neighbours.
+    Returns the painted path length added.
+    """
+    path_length = 0.0
+    for region in find_regions(blocked | visited):
+        # find_regions returns cells row-major; alternate the column order per row
+        rows = {}
+        for row, col in region:
+            rows.setdefault(row, []).append(col)
+        region = [
+            (row, col)
+            for i, row in enumerate(sorted(rows))
+            for col in (rows[row] if i % 2 == 0 else reversed(rows[row]))
+        ]
+        
+        if waypoints:
+            # Start from the end of the serpentine nearer to the robot
+            last_row, last_col = _coord_to_cell(
+                waypoints[-1].x, waypoints[-1].y, config.coverage_width, blocked
+            )
+            def distance(rc):
+                return abs(rc[0] - last_row) + abs(rc[1] - last_col)
+            if distance(region[-1]) < distance(region[0]):
+                region.reverse()
+        
+        # Paint the region
+        for row, col in region:
+            x, y = float(xs[col]), float(ys[row])
+            if waypoints and not is_neighbour(waypoints[-1].x, waypoints[-1].y, x, y, config.coverage_width):
+                # Navigate around obstacles, stopping short of the cell itself
+                nav_path = find_path_around_obstacles(
+                    xs, ys, blocked, waypoints[-1].x, waypoints[-1].y, (row, col), config
+                )
+                waypoints.extend(nav_path[:-1])
+            
+            if waypoints and is_neighbour(waypoints[-1].x, waypoints[-1].y, x, y, config.coverage_width):
+                action = "paint"
+                if waypoints[-1].y == y:
+                    path_length += abs(x - waypoints[-1].x)
+            else:
+                action = "move"
+            waypoints.append(Waypoint.model_construct(x=x, y=y, action=action))
+            visited[row, col] = True
+    
+    return path_length
 
 def remove_consecutive_duplicates(waypoints: List[Waypoint]) -> List[Waypoint]:
     """Remove consecutive duplicate waypoints"""
@@ -1,15 +1,34 @@
 import os
-import redis
+import redis.asyncio as redis
 import json
+from typing import Optional
+from redis.exceptions import RedisError
+from app.logger import logger
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 CHANNEL_NAME = "trajectory_updates"
+CACHE_TTL = 3600
 
 redis_client = redis.Redis.from_url(REDIS_URL)
 
-def publish_trajectory_event(trajectory_id: str, metadata: dict):
+async def publish_trajectory_event(trajectory_id: str, metadata: dict):
     message = {
         "trajectory_id": trajectory_id,
         "metadata": metadata
     }
-    redis_client.publish(CHANNEL_NAME, json.dumps(message))
\ No newline at end of file
+    await redis_client.publish(CHANNEL_NAME, json.dumps(message))
+
+# Trajectories are cached under traj:<id> as the same packed bytes stored in
+# SQLite. The cache is best effort: Redis errors count as a miss.
+async def get_cached_trajectory(trajectory_id: str) -> Optional[bytes]:
+    try:
+        return await redis_client.get(f"traj:{trajectory_id}")
+    except RedisError as e:
+        logger.warning(f"Trajectory cache unavailable: {str(e)}")
+        return None
+
+async def cache_trajectory(trajectory_id: str, blob: bytes):
+    try:
+        await redis_client.set(f"traj:{trajectory_id}", blob, ex=CACHE_TTL)
+    except RedisError as e:
+        logger.warning(f"Trajectory cache unavailable: {str(e)}")
\ No newline at end of file
@@ -1,12 +1,18 @@
 #/app
 #database.py
 import sqlite3
+import threading
 from typing import List
 from app.planner import Waypoint
 
 DB_PATH = "data/robot_trajectories.db"
+_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+_conn.execute("PRAGMA journal_mode=WAL")
+_conn.execute("PRAGMA synchronous=NORMAL")
+_lock = threading.Lock()
+
 def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    return _conn
 
 def init_db():
     conn = get_connection()
@@ -37,7 +43,6 @@ def init_db():
     """)
 
     conn.commit()
-    conn.close()
 
 def save_trajectory(
     trajectory_id: str,
@@ -48,7 +53,7 @@ def save_trajectory(
     waypoints: List[Waypoint],
     duration: float
 ):
-    with sqlite3.connect(DB_PATH, check_same_thread=False) as conn:
+    with _lock, get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT 1 FROM trajectories WHERE id = ?", (trajectory_id,))
         if cursor.fetchone():
@@ -72,7 +77,7 @@ def save_trajectory(
 
 
 def get_trajectory_by_id(trajectory_id: str) -> List[Waypoint]:
-    with sqlite3.connect(DB_PATH, check_same_thread=False) as conn:
+    with _lock, get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
         SELECT x, y, action FROM waypoints
@@ -3,14 +3,18 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.planner import WallConfig, Obstacle
 
-client = TestClient(app)
+@pytest.fixture(scope="module")
+def client():
+    # Run the app lifespan so every request shares one event loop (and Redis pool)
+    with TestClient(app) as client:
+        yield client
 
-def test_health_check():
+def test_health_check(client):
     response = client.get("/api/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
 
-def test_create_and_retrieve_trajectory():
+def test_create_and_retrieve_trajectory(client):
     config = {
         "width": 2.0,
         "height": 1.0,
@@ -29,15 +33,16 @@ def test_create_and_retrieve_trajectory():
 
     # Extract trajectory ID from config hash
     import hashlib
-    config_str = f"{config['width']}-{config['height']}-[{(0.5, 0.2, 0.3, 0.3)}]"
-    config_hash = hashlib.md5(config_str.encode()).hexdigest()
+    import struct
+    config_bytes = struct.pack("<7d", config['width'], config['height'], config['coverage_width'], 0.5, 0.2, 0.3, 0.3)
+    config_hash = hashlib.blake2b(config_bytes, digest_size=16).hexdigest()
 
     # Retrieve trajectory
     get_response = client.get(f"/api/trajectories/{config_hash}")
     assert get_response.status_code == 200
     assert get_response.json() == waypoints
 
-def test_metrics_endpoint():
+def test_metrics_endpoint(client):
     response = client.get("/api/metrics")
     assert response.status_code == 200
     data = response.json()
@@ -45,3 +50,8 @@ def test_metrics_endpoint():
     assert "avg_coverage_percent" in data
     assert "avg_duration" in data
     assert "latest_timestamp" in data
+
+def test_invalid_config_rejected(client):
+    response = client.post("/api/trajectories", json={"width": "wide", "height": 1.0, "obstacles": []})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "width"]
@@ -14,8 +14,10 @@ def test_save_and_retrieve():
         coverage_width=0.15,
         obstacles=0,
         waypoints=waypoints,
+        path_length=1.0,
         duration=0.5
     )
     retrieved = get_trajectory_by_id(trajectory_id)
     assert len(retrieved) == 2
-    assert retrieved[0].action == "move"
\ No newline at end of file
+    assert retrieved[0].action == "move"
+    assert [(wp.x, wp.y, wp.action) for wp in retrieved] == [(wp.x, wp.y, wp.action) for wp in waypoints]
\ No newline at end of file
@@ -1,9 +1,15 @@
-from app.planner import generate_trajectory, WallConfig, Obstacle
+import numpy as np
+from app.planner import (
+    generate_trajectory, create_grid, paint_with_obstacle_avoidance, find_regions,
+    fill_isolated_regions, _coord_to_cell,
+    WallConfig, Obstacle, Waypoint
+)
 
 def test_simple_wall():
     config = WallConfig(width=5.0, height=3.0, obstacles=[])
-    trajectory = generate_trajectory(config)
+    trajectory, path_length = generate_trajectory(config)
     assert len(trajectory) > 0
+    assert path_length > 0
     assert all(wp.action in ["move", "paint"] for wp in trajectory)
 
 def test_with_obstacle():
@@ -12,5 +18,64 @@ def test_with_obstacle():
         height=3.0,
         obstacles=[Obstacle(x=2.0, y=1.0, width=1.0, height=1.0)]
     )
-    trajectory = generate_trajectory(config)
-    assert any(wp.x < 2.0 or wp.x > 3.0 for wp in trajectory)  # skips obstacle
\ No newline at end of file
+    trajectory, _ = generate_trajectory(config)
+    assert any(wp.x < 2.0 or wp.x > 3.0 for wp in trajectory)  # skips obstacle
+
+def test_fill_isolated_regions_paints_every_region():
+    config = WallConfig(width=1.5, height=0.9, coverage_width=0.3, obstacles=[])
+    xs, ys, blocked = create_grid(config)
+    blocked[:, 2] = True  # wall splits the grid into two regions
+    visited = np.zeros_like(blocked)
+    visited[0, :] = True
+    waypoints = [Waypoint(x=float(xs[0]), y=float(ys[0]), action="paint")]
+
+    assert len(find_regions(blocked | visited)) == 2
+    painted = fill_isolated_regions(xs, ys, blocked, visited, waypoints, config)
+    assert painted > 0
+    assert visited[~blocked].all()
+    assert not any(abs(wp.x - xs[2]) < 1e-9 for wp in waypoints)
+
+
+def test_coord_to_cell_skips_blocked_cells():
+    config = WallConfig(width=1.5, height=0.9, coverage_width=0.3, obstacles=[])
+    xs, ys, blocked = create_grid(config)
+    assert _coord_to_cell(0.7, 0.4, 0.3, blocked) == (1, 2)
+    blocked[1, 2] = True
+    row, col = _coord_to_cell(0.7, 0.4, 0.3, blocked)
+    assert abs(row - 1) + abs(col - 2) == 1
+
+def test_obstacle_free_wall_matches_general_planner():
+    config = WallConfig(width=2.0, height=1.0, obstacles=[])
+    trajectory, path_length = generate_trajectory(config)
+    xs, ys, blocked = create_grid(config)
+    expected, expected_length = paint_with_obstacle_avoidance(xs, ys, blocked, config)
+    assert [(wp.x, wp.y, wp.action) for wp in trajectory] == [(wp.x, wp.y, wp.action) for wp in expected]
+    assert abs(path_length - expected_length) < 1e-9
+
+def test_fill_isolated_regions_never_crosses_obstacles():
+    config = WallConfig(width=1.8, height=0.9, coverage_width=0.3, obstacles=[])
+    xs, ys, blocked = create_grid(config)
+    blocked[1, 1:5] = True
+    blocked[2, :] = True
+    visited = np.zeros_like(blocked)
+    visited[0, :] = True
+    waypoints = [Waypoint(x=float(xs[5]), y=float(ys[0]), action="paint")]
+
+    fill_isolated_regions(xs, ys, blocked, visited, waypoints, config)
+    assert visited[~blocked].all()
+    cells = [(round(wp.y / 0.3 - 0.5), round(wp.x / 0.3 - 0.5)) for wp in waypoints]
+    assert not any(blocked[cell] for cell in cells)
+    # Every step moves to a 4-connected neighbour, so no step can cut through an obstacle
+    assert all(abs(r1 - r0) + abs(c1 - c0) <= 1 for (r0, c0), (r1, c1) in zip(cells, cells[1:]))
+
+def test_fill_isolated_regions_paints_region_in_serpentine():
+    config = WallConfig(width=1.5, height=1.2, coverage_width=0.3, obstacles=[])
+    xs, ys, blocked = create_grid(config)
+    visited = np.zeros_like(blocked)
+    visited[0, :] = True
+    waypoints = [Waypoint(x=float(xs[0]), y=float(ys[0]), action="paint")]
+
+    fill_isolated_regions(xs, ys, blocked, visited, waypoints, config)
+    assert visited.all()
+    # Every row continues from the end of the previous one, so nothing needs a move
+    assert all(wp.action == "paint" for wp in waypoints)